@@ -9,42 +9,89 @@ from __future__ import annotations
 import os
 import sys
 import math
+import hashlib
+import importlib.util
+import io
+import json
+import functools
+import gzip
 import platform
+import re
 import socket
+import sqlite3
 import threading
 import time
 import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 from typing import List, Dict, Any, Tuple, Optional
 
+import numpy as np
 import pandas as pd
 import requests
-from flask import Flask, request, jsonify, render_template
+from requests.adapters import HTTPAdapter
+from flask import Flask, Response, request, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
+
+# Selenium（用于打开浏览器和截图）：启动时只检查是否安装，模块在首次使用时由 _ensure_selenium 导入
+SELENIUM_AVAILABLE = importlib.util.find_spec("selenium") is not None
+webdriver = Service = Options = By = WebDriverWait = EC = None
+if not SELENIUM_AVAILABLE:
+    print("⚠️ 警告：未安装 selenium，将无法自动打开浏览器")
+    print("   建议安装：pip install selenium")
 
-# Selenium 相关导入（用于打开浏览器）
+# waitress（生产环境WSGI服务器，可选；未安装时使用Flask开发服务器）
 try:
-    from selenium import webdriver
-    from selenium.webdriver.edge.service import Service
-    from selenium.webdriver.edge.options import Options
-    from selenium.webdriver.common.by import By
-    SELENIUM_AVAILABLE = True
+    from waitress import serve as waitress_serve
+    WAITRESS_AVAILABLE = True
 except ImportError:
-    SELENIUM_AVAILABLE = False
-    By = None
-    print("⚠️ 警告：未安装 selenium，将无法自动打开浏览器")
-    print("   建议安装：pip install selenium")
+    WAITRESS_AVAILABLE = False
+
+# orjson（高性能JSON库，可选；未安装时使用标准库 json）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# python-calamine（Rust实现的Excel解析器，可选，用于加速 .xlsx / .xls 读取）
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# numba（JIT编译，可选；用于加速距离矩阵与 2-opt 计算，未安装时使用 NumPy 实现）
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
 
 # ==================== 配置常量 ====================
 # 服务器配置
 HOST = "127.0.0.1"
 PORT = 5006
-DEBUG_MODE = True
+# 开发环境开启调试模式（使用Flask开发服务器）；打包后的EXE关闭调试模式，使用 waitress 生产服务器
+DEBUG_MODE = not getattr(sys, 'frozen', False)
+# waitress 处理请求的工作线程数
+SERVER_THREADS = 8
 
 # 实际使用的端口（可能在启动时自动调整）
 _actual_port = PORT
 
+# Edge 浏览器持久化用户数据目录（跨次运行复用浏览器缓存，百度地图脚本无需重复下载）
+EDGE_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".route_system_edge_profile")
+# Edge 磁盘缓存大小（字节）
+EDGE_DISK_CACHE_SIZE = 256 * 1024 * 1024
+
 # 全局浏览器实例（用于截图功能复用）
 _global_browser_driver = None
 _browser_lock = threading.Lock()
+# Selenium 延迟导入锁
+_selenium_lock = threading.Lock()
 
 # 百度地图API配置
 BAIDU_WEB_AK = os.getenv("BAIDU_WEB_AK", "PnhCYT0obcdXPMchgzYz8QE4Y5ezbq36")
@@ -58,20 +105,133 @@ API_TIMEOUT = 20
 API_RETRY_COUNT = 3
 # API请求重试延迟（秒）
 API_RETRY_DELAY = 1
+# 并发请求路段的最大线程数
+API_MAX_WORKERS = 16
+# 路段缓存：坐标保留的小数位数（5位约1米）及最大缓存条数
+LEG_CACHE_PRECISION = 5
+LEG_CACHE_SIZE = 4096
+# 起终点直线距离小于该值（米）的路段视为同一位置，直接按直线生成，不调用百度API
+SHORT_LEG_THRESHOLD_M = 15
+# 路段磁盘缓存（SQLite，跨次运行复用）文件名及有效期（秒）
+LEG_DISK_CACHE_FILE = "leg_cache.sqlite3"
+LEG_DISK_CACHE_TTL = 30 * 24 * 3600
+# Excel解析结果缓存的最大文件数
+EXCEL_CACHE_SIZE = 16
+# 最远点对结果缓存的最大条数（同一组网点只是顺序不同时直接复用）
+FARTHEST_CACHE_SIZE = 64
+# 逆地理编码缓存：坐标保留的小数位数（4位约11米）及最大缓存条数
+GEOCODE_CACHE_PRECISION = 4
+GEOCODE_CACHE_SIZE = 8192
+
+# Excel文本列与网点字段的对应关系（经度、纬度为数值列；网点名称必需，其余可选）
+EXCEL_TEXT_COLUMNS = {
+    "网点名称": "name",
+    "备注": "remark",
+    "网组": "group",
+    "工号": "employee_id",
+    "姓名": "employee_name",
+    "县区": "district",
+    "调整": "adjustment",
+    "遮罩": "mask",
+}
+
+# 响应压缩：超过该字节数的文本类响应使用 gzip 压缩，压缩级别取偏快的 4
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 4
+COMPRESS_MIMETYPES = {"application/json", "text/html", "application/javascript"}
+
+# 地球半径（米）
+EARTH_RADIUS_M = 6371000
+# 最远网点计算时，超过该数量按行分块计算距离矩阵，避免一次性分配 n×n 内存
+FARTHEST_CHUNK_SIZE = 2000
+# 网点数不少于该值时，先求凸包再在凸包顶点中找最远点对
+FARTHEST_HULL_MIN_POINTS = 8
+# 2-opt 路线优化的最大迭代轮数
+TWO_OPT_MAX_SWEEPS = 50
+# 网点数超过该值时不再构建完整距离矩阵（n×n float64 约占 n²×8 字节）：最近邻逐步只计算到未访问网点的距离，并跳过 2-opt
+DIST_MATRIX_MAX_POINTS = 3000
 
 # ==================== Flask应用初始化 ====================
 app = Flask(__name__)
 
 
+if ORJSON_AVAILABLE:
+    class ORJSONProvider(DefaultJSONProvider):
+        """
+        使用 orjson 的 JSON 提供器：jsonify、request.get_json 等 Flask 内置的 JSON 处理都走 orjson
+        键按顺序排列，与默认提供器输出一致；无法直接序列化的类型交给默认提供器的 default 处理
+        """
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            option = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if kwargs.get("indent"):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+        def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    app.json_provider_class = ORJSONProvider
+    app.json = ORJSONProvider(app)
+
+# 复用同一个 HTTP 会话（保持长连接，避免每个路段都重新握手）
+# 连接池大小与并发线程数一致；连接层不做重试，超时、连接失败及 HTTP 错误统一由 _driving_leg_cached 的重试循环处理
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=API_MAX_WORKERS,
+))
+# 同时挂载 http://，API 地址改为 http 时同样使用该连接池
+_http_session.mount("http://", _http_session.get_adapter("https://"))
+
+# 驾车路线请求中固定不变的查询参数（预先编码一次，每个路段只需拼接起终点坐标）
+_DIRECTIONLITE_FIXED_QUERY = urlencode({
+    "ak": BAIDU_WEB_AK,
+    "coord_type": "bd09ll",
+    "ret_coordtype": "bd09ll",
+    "steps_info": 1,
+    "tactics": 0,  # 0=不走高速，1=最短时间，2=最短距离
+})
+
+# 逆地理编码请求中固定不变的查询参数（预先编码一次，每个点只需拼接坐标）
+_GEOCODING_FIXED_QUERY = urlencode({
+    "ak": BAIDU_WEB_AK,
+    "output": "json",
+    "coordtype": "bd09ll",
+    "extensions_poi": 0,
+    "extensions_road": 0,
+    "extensions_town": 1,  # 返回乡镇信息
+})
+
+# 请求路段的共享线程池：所有请求共用，总并发不超过连接池大小，也省去每次请求创建线程的开销
+_leg_executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix="baidu-leg")
+
+# 渲染后的首页缓存：(HTML字节, ETag)
+_index_html_cache: Optional[Tuple[bytes, str]] = None
+
+# 路段磁盘缓存连接（首次使用时打开；打开失败则为 False，仅使用内存缓存）
+_leg_disk_cache = None
+_leg_disk_cache_lock = threading.Lock()
+
+# Excel解析及分组结果缓存（键为文件内容的SHA256，值为 /upload_excel 的响应数据）
+_excel_cache: Dict[str, Dict[str, Any]] = {}
+_excel_cache_lock = threading.Lock()
+
+# 最远点对缓存（键为网点坐标集合，值为两个端点坐标及距离）
+_farthest_cache: Dict[frozenset, Tuple[Tuple[float, float], Tuple[float, float], float]] = {}
+_farthest_cache_lock = threading.Lock()
+
+
 def _require_ak():
     if not BAIDU_WEB_AK:
         raise RuntimeError("后端未配置 BAIDU_WEB_AK。请设置环境变量 BAIDU_WEB_AK 或在 app.py 中写入。")
 
 
+@functools.lru_cache(maxsize=None)
 def _get_base_dir():
     """
     获取程序基础目录
     在打包成exe后，返回exe所在目录；在开发环境中，返回脚本所在目录
+    运行期间不会变化，结果缓存
     """
     if getattr(sys, 'frozen', False):
         # 打包成exe后，使用exe所在目录
@@ -92,7 +252,9 @@ def _get_actual_port():
 
 def _is_port_available(host: str, port: int) -> bool:
     """
-    检查端口是否可用
+    检查端口是否可用（直接尝试绑定，不发起连接，立即返回）
+    Windows 上使用 SO_EXCLUSIVEADDRUSE（该平台的 SO_REUSEADDR 允许抢占已被监听的端口，不能用于检测）；
+    其他平台使用 SO_REUSEADDR，避免上次退出残留的 TIME_WAIT 连接导致误判为占用
     
     Args:
         host: 主机地址
@@ -103,10 +265,13 @@ def _is_port_available(host: str, port: int) -> bool:
     """
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(1)
-            result = s.connect_ex((host, port))
-            return result != 0  # 0 表示连接成功（端口被占用）
-    except Exception:
+            if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((host, port))
+            return True
+    except OSError:
         return False
 
 
@@ -129,10 +294,34 @@ def _find_available_port(host: str, start_port: int, max_attempts: int = 10) ->
     return None
 
 
+def _wait_for_port(host: str, port: int, timeout: float = 10.0) -> bool:
+    """
+    等待服务器开始监听端口（用于替代固定时长的 sleep）
+    
+    Args:
+        host: 主机地址
+        port: 端口号
+        timeout: 最长等待时间（秒）
+    
+    Returns:
+        端口在超时前可连接返回 True，否则返回 False
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+@functools.lru_cache(maxsize=None)
 def _get_edge_binary_path():
     """
     根据操作系统获取 Edge 浏览器的可执行文件路径
     支持多种检测方式，提高跨电脑兼容性
+    检测涉及文件、注册表和PATH查找，结果在进程内缓存
     
     Returns:
         Edge 浏览器路径，如果未找到返回 None
@@ -214,6 +403,42 @@ def _get_edge_binary_path():
         return None
 
 
+@functools.lru_cache(maxsize=None)
+def _get_capture_screenshot_sync():
+    """
+    首次截图时导入 jietu 模块（其模块级导入 Selenium，较重，不放在启动阶段），之后直接复用
+    导入失败时抛出 ImportError（不缓存，安装依赖后无需重启即可重试）
+    """
+    from jietu import capture_screenshot_sync
+    return capture_screenshot_sync
+
+
+def _ensure_selenium() -> bool:
+    """
+    首次调用时导入 Selenium 相关模块并保存到模块全局变量
+    返回：Selenium 是否可用
+    """
+    global SELENIUM_AVAILABLE, webdriver, Service, Options, By, WebDriverWait, EC
+    if webdriver is not None or not SELENIUM_AVAILABLE:
+        return SELENIUM_AVAILABLE
+    with _selenium_lock:
+        if webdriver is None:
+            try:
+                from selenium.webdriver.edge.service import Service as _Service
+                from selenium.webdriver.edge.options import Options as _Options
+                from selenium.webdriver.common.by import By as _By
+                from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+                from selenium.webdriver.support import expected_conditions as _EC
+                from selenium import webdriver as _webdriver
+            except ImportError as e:
+                print(f"⚠️ 警告：导入 selenium 失败，将无法自动打开浏览器: {e}")
+                SELENIUM_AVAILABLE = False
+                return False
+            Service, Options, By, WebDriverWait, EC = _Service, _Options, _By, _WebDriverWait, _EC
+            webdriver = _webdriver
+    return True
+
+
 def _create_browser_instance():
     """
     创建新的浏览器实例
@@ -221,7 +446,7 @@ def _create_browser_instance():
     """
     global _global_browser_driver
     
-    if not SELENIUM_AVAILABLE:
+    if not _ensure_selenium():
         print("[浏览器] ⚠️ Selenium 未安装，无法创建浏览器实例")
         return None
     
@@ -271,6 +496,19 @@ def _create_browser_instance():
             edge_options.add_argument('--disable-translate')  # 禁用翻译提示
             edge_options.add_argument('--disable-features=TranslateUI')  # 禁用翻译UI
             edge_options.add_argument('--disable-component-update')  # 禁用组件更新提示
+            # 使用持久化的用户数据目录和磁盘缓存
+            profile_args = []
+            try:
+                os.makedirs(EDGE_PROFILE_DIR, exist_ok=True)
+                profile_args = [
+                    f'--user-data-dir={EDGE_PROFILE_DIR}',
+                    f'--disk-cache-dir={os.path.join(EDGE_PROFILE_DIR, "cache")}',
+                    f'--disk-cache-size={EDGE_DISK_CACHE_SIZE}',
+                ]
+                for arg in profile_args:
+                    edge_options.add_argument(arg)
+            except OSError as e:
+                print(f"[浏览器] ⚠️ 创建浏览器配置目录失败: {e}，将使用临时配置")
             # 添加首选项来禁用重置设置提示
             try:
                 prefs = {
@@ -289,7 +527,16 @@ def _create_browser_instance():
             try:
                 service = Service()
                 print("[浏览器] 正在启动 Edge 浏览器...")
-                driver = webdriver.Edge(service=service, options=edge_options)
+                try:
+                    driver = webdriver.Edge(service=service, options=edge_options)
+                except Exception as e:
+                    if not profile_args:
+                        raise
+                    # 上次运行留下的浏览器可能仍占用配置目录，改用临时配置重试
+                    print(f"[浏览器] ⚠️ 使用持久化配置启动失败: {e}，改用临时配置重试...")
+                    for arg in profile_args:
+                        edge_options.arguments.remove(arg)
+                    driver = webdriver.Edge(service=Service(), options=edge_options)
                 driver.set_page_load_timeout(20)
                 driver.implicitly_wait(5)
                 
@@ -397,6 +644,20 @@ def _create_browser_instance():
         return None
 
 
+def _wait_for_app_page(driver, timeout: float = 5.0) -> bool:
+    """
+    导航后等待应用页面加载完成（控制面板元素出现即返回，用于替代固定时长的 sleep）
+    返回：是否在超时前加载完成
+    """
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.ID, "control-panel"))
+        )
+        return True
+    except Exception:
+        return False
+
+
 def _check_browser_instance(create_if_missing: bool = True):
     """
     检查浏览器实例是否有效
@@ -449,13 +710,13 @@ def _check_browser_instance(create_if_missing: bool = True):
                 print(f"[浏览器检查] 当前URL ({current_url}) 不是目标URL，正在导航到: {target_url}")
                 _global_browser_driver.get(target_url)
                 # 等待页面加载
-                time.sleep(1)
+                _wait_for_app_page(_global_browser_driver)
         except Exception as check_e:
             # 如果检查失败，尝试导航到目标URL
             print(f"[浏览器检查] 检查页面状态失败: {check_e}，尝试导航到: {target_url}")
             _global_browser_driver.get(target_url)
             # 等待页面加载
-            time.sleep(1)
+            _wait_for_app_page(_global_browser_driver)
         
         print(f"[浏览器检查] ✓ 浏览器实例有效，当前URL: {current_url}")
         return _global_browser_driver
@@ -489,22 +750,63 @@ def _check_browser_instance(create_if_missing: bool = True):
             return None
 
 
-def _safe_float(x) -> float:
-    try:
-        return float(x)
-    except Exception:
-        return float("nan")
+def _excel_text_column(series: pd.Series) -> np.ndarray:
+    """
+    将Excel文本列统一转换为去除首尾空白的字符串数组，空值转换为空字符串
+    """
+    return series.astype(object).where(series.notna(), "").astype(str).str.strip().to_numpy()
+
+
+def _calamine_cell(value):
+    """
+    将 calamine 读出的单元格值转换为与 pandas 默认引擎一致的形式：
+    空单元格为 None，整数值的浮点数转换为 int
+    """
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _load_excel_frame(file_stream, filename: str = "") -> pd.DataFrame:
+    """
+    读取Excel第一个工作表中用得到的列
+    .xlsx / .xls 文件优先使用 python-calamine 解析（.xls 无需另装 xlrd），
+    未安装或解析失败时回退到 pandas 默认引擎
+    """
+    known_columns = {"经度", "纬度", *EXCEL_TEXT_COLUMNS}
+
+    if CALAMINE_AVAILABLE and filename.lower().endswith((".xlsx", ".xls")):
+        try:
+            rows = CalamineWorkbook.from_filelike(file_stream).get_sheet_by_index(0).to_python(skip_empty_area=True)
+        except Exception as e:
+            print(f"[Excel] calamine 解析失败，改用默认引擎: {e}")
+            file_stream.seek(0)
+        else:
+            if not rows:
+                return pd.DataFrame()
+            header = rows[0]
+            keep = [i for i, column in enumerate(header) if str(column) in known_columns]
+            data = [[_calamine_cell(row[i]) for i in keep] for row in rows[1:]]
+            return pd.DataFrame(data, columns=[header[i] for i in keep])
+
+    return pd.read_excel(file_stream, usecols=lambda c: str(c) in known_columns)
 
 
-def _read_excel_locations(file_stream) -> List[Dict[str, Any]]:
+def _read_excel_locations(file_stream, filename: str = "") -> List[Dict[str, Any]]:
     """
     读取Excel文件，解析网点数据
     支持列：经度、纬度、网点名称、备注(可选)、网组(可选)、工号(可选)、姓名(可选)、县区(可选)、调整(可选)、遮罩(可选)
     
+    Args:
+        file_stream: Excel文件流
+        filename: 原始文件名，用于根据扩展名选择解析引擎
+    
     Returns:
         网点列表，每个网点包含：lng, lat, name, remark, group, employee_id, employee_name, district, adjustment, mask
     """
-    df = pd.read_excel(file_stream)
+    df = _load_excel_frame(file_stream, filename)
 
     # 兼容列名（严格按中文列名最稳）
     # 必需：经度、纬度、网点名称
@@ -514,55 +816,138 @@ def _read_excel_locations(file_stream) -> List[Dict[str, Any]]:
     if missing:
         raise ValueError(f"Excel缺少列：{', '.join(missing)}。需要：经度、纬度、网点名称；备注、网组、工号、姓名、县区、调整、遮罩可选。")
 
-    if "备注" not in df.columns:
-        df["备注"] = ""
-    if "网组" not in df.columns:
-        df["网组"] = ""
-    if "工号" not in df.columns:
-        df["工号"] = ""
-    if "姓名" not in df.columns:
-        df["姓名"] = ""
-    if "县区" not in df.columns:
-        df["县区"] = ""
-    if "调整" not in df.columns:
-        df["调整"] = ""
-    if "遮罩" not in df.columns:
-        df["遮罩"] = ""
-
-    locations = []
-    for _, r in df.iterrows():
-        lng = _safe_float(r["经度"])
-        lat = _safe_float(r["纬度"])
-        name = "" if pd.isna(r["网点名称"]) else str(r["网点名称"]).strip()
-        remark = "" if pd.isna(r["备注"]) else str(r["备注"]).strip()
-        group = "" if pd.isna(r["网组"]) else str(r["网组"]).strip()
-        employee_id = "" if pd.isna(r["工号"]) else str(r["工号"]).strip()
-        employee_name = "" if pd.isna(r["姓名"]) else str(r["姓名"]).strip()
-        district = "" if pd.isna(r["县区"]) else str(r["县区"]).strip()
-        adjustment = "" if pd.isna(r["调整"]) else str(r["调整"]).strip()
-        mask = "" if pd.isna(r["遮罩"]) else str(r["遮罩"]).strip()
-        if not name:
-            continue
-        if math.isnan(lng) or math.isnan(lat):
+    # 按列向量化转换，无效的经纬度转换为 NaN
+    lng = pd.to_numeric(df["经度"], errors="coerce").to_numpy(dtype=np.float64)
+    lat = pd.to_numeric(df["纬度"], errors="coerce").to_numpy(dtype=np.float64)
+    texts = {
+        field: _excel_text_column(df[column]) if column in df.columns else None
+        for column, field in EXCEL_TEXT_COLUMNS.items()
+    }
+
+    # 跳过名称为空或经纬度无效的行
+    keep = np.flatnonzero(~np.isnan(lng) & ~np.isnan(lat) & (texts["name"] != ""))
+
+    fields = ["lng", "lat", *texts]
+    columns = [lng[keep].tolist(), lat[keep].tolist()]
+    for values in texts.values():
+        columns.append(values[keep].tolist() if values is not None else [""] * len(keep))
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+# 百度 path 字段中除分隔符外的字符（用于快速校验分隔符结构）
+_PATH_SEPARATORS_RE = re.compile(r"[^,;]+")
+
+
+def _parse_step_paths(steps: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    解析百度路线各步骤的 path 字段为路线点数组，形状为 (n, 2)，每行为 [lng, lat]
+    格式正常时拼接后一次性交给 NumPy 解析；格式异常时逐点解析并跳过无效坐标
+    """
+    paths = [st.get("path", "") for st in steps or []]
+    # path格式: "lng,lat;lng,lat;..."
+    joined = ";".join(path for path in paths if path)
+    if not joined:
+        return np.empty((0, 2))
+
+    # 快速路径要求分隔符严格为 ",;,;...,"（每个点恰好一个逗号），再整体交给 NumPy 转换；
+    # 不使用 np.fromstring：它对无效内容只发出警告，而切换全局警告过滤器在多线程下并不安全
+    pair_count = joined.count(";") + 1
+    if _PATH_SEPARATORS_RE.sub("", joined) == ",;" * (pair_count - 1) + ",":
+        try:
+            values = np.array(joined.replace(";", ",").split(","), dtype=np.float64)
+            return values.reshape(-1, 2)
+        except ValueError:
+            pass
+
+    poly = []
+    for pair in joined.split(";"):
+        if not pair or "," not in pair:
             continue
-        locations.append({
-            "lng": lng, 
-            "lat": lat, 
-            "name": name, 
-            "remark": remark, 
-            "group": group,
-            "employee_id": employee_id,
-            "employee_name": employee_name,
-            "district": district,
-            "adjustment": adjustment,
-            "mask": mask
-        })
-    return locations
+        try:
+            lng_s, lat_s = pair.split(",", 1)
+            poly.append([float(lng_s), float(lat_s)])
+        except ValueError:
+            continue  # 跳过无效的坐标点
+    return np.array(poly, dtype=np.float64).reshape(-1, 2)
+
+
+def _get_leg_disk_cache():
+    """
+    获取路段磁盘缓存连接（需在持有 _leg_disk_cache_lock 时调用）
+    目录不可写等原因导致打开失败时返回 None，调用方退回到仅使用内存缓存
+    """
+    global _leg_disk_cache
+    if _leg_disk_cache is None:
+        try:
+            conn = sqlite3.connect(os.path.join(_get_base_dir(), LEG_DISK_CACHE_FILE), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS legs (key TEXT PRIMARY KEY, poly TEXT, dist INTEGER, dur INTEGER, ts REAL)"
+            )
+            conn.execute("DELETE FROM legs WHERE ts < ?", (time.time() - LEG_DISK_CACHE_TTL,))
+            conn.commit()
+            _leg_disk_cache = conn
+        except sqlite3.Error as e:
+            print(f"[路段缓存] ⚠️ 无法打开磁盘缓存，仅使用内存缓存: {e}")
+            _leg_disk_cache = False
+    return _leg_disk_cache or None
+
+
+def _leg_disk_cache_get(key: str) -> Optional[Tuple[np.ndarray, int, int]]:
+    """从磁盘缓存读取路段，未命中或已过期返回 None"""
+    with _leg_disk_cache_lock:
+        conn = _get_leg_disk_cache()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT poly, dist, dur FROM legs WHERE key = ? AND ts >= ?",
+                (key, time.time() - LEG_DISK_CACHE_TTL),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    if row is None:
+        return None
+    return np.array(app.json.loads(row[0]), dtype=np.float64).reshape(-1, 2), row[1], row[2]
 
 
-def _call_driving_leg(a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[List[List[float]], int, int]:
+def _leg_disk_cache_put(key: str, poly: np.ndarray, dist: int, dur: int):
+    """写入磁盘缓存，失败时忽略"""
+    # 路线点序列化放在锁外；orjson 可直接序列化连续的 ndarray，无需先转成嵌套列表
+    if ORJSON_AVAILABLE:
+        poly_json = orjson.dumps(np.ascontiguousarray(poly), option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    else:
+        poly_json = json.dumps(poly.tolist(), separators=(",", ":"))
+    with _leg_disk_cache_lock:
+        conn = _get_leg_disk_cache()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO legs (key, poly, dist, dur, ts) VALUES (?, ?, ?, ?, ?)",
+                (key, poly_json, dist, dur, time.time()),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[路段缓存] ⚠️ 写入磁盘缓存失败: {e}")
+
+
+def _leg_disk_cache_clear():
+    """清空磁盘缓存中的全部路段"""
+    with _leg_disk_cache_lock:
+        conn = _get_leg_disk_cache()
+        if conn is None:
+            return
+        try:
+            conn.execute("DELETE FROM legs")
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[路段缓存] ⚠️ 清空磁盘缓存失败: {e}")
+
+
+def _call_driving_leg(a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[np.ndarray, int, int]:
     """
     调用百度地图API获取两点之间的驾车路线（带重试机制）
+    相同起终点（坐标按 LEG_CACHE_PRECISION 取整）的结果会被缓存复用
     
     Args:
         a: 起点，包含 lng, lat 字段
@@ -570,34 +955,68 @@ def _call_driving_leg(a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[List[List[f
     
     Returns:
         Tuple[polyline, distance, duration]:
-        - polyline: 路线点列表 [[lng, lat], ...]
+        - polyline: 路线点数组 (n, 2)，每行为 [lng, lat]（只读，与缓存共享）
         - distance: 距离（米）
         - duration: 时间（秒）
     
     Raises:
         RuntimeError: API调用失败或返回错误（重试后仍失败）
     """
+    return _driving_leg_cached(
+        round(a["lng"], LEG_CACHE_PRECISION),
+        round(a["lat"], LEG_CACHE_PRECISION),
+        round(b["lng"], LEG_CACHE_PRECISION),
+        round(b["lat"], LEG_CACHE_PRECISION),
+    )
+
+
+def _retry_after_seconds(resp: requests.Response) -> float:
+    """
+    限流响应的等待时间：优先使用 Retry-After（秒），不少于 API_RETRY_DELAY，不超过 API_TIMEOUT
+    """
+    try:
+        delay = float(resp.headers.get("Retry-After", API_RETRY_DELAY))
+    except (TypeError, ValueError):
+        delay = API_RETRY_DELAY
+    return min(max(delay, API_RETRY_DELAY), API_TIMEOUT)
+
+
+@functools.lru_cache(maxsize=LEG_CACHE_SIZE)
+def _driving_leg_cached(a_lng: float, a_lat: float, b_lng: float, b_lat: float) -> Tuple[np.ndarray, int, int]:
+    """
+    实际请求百度驾车路线的函数，结果以只读 NumPy 数组形式缓存（每点 16 字节）
+    内存缓存未命中时先查磁盘缓存，仍未命中才请求百度API
+    失败时抛出异常，异常不会被缓存
+    """
     _require_ak()
 
-    # 注意：百度接口参数为 lat,lng
-    params = {
-        "ak": BAIDU_WEB_AK,
-        "origin": f'{a["lat"]},{a["lng"]}',
-        "destination": f'{b["lat"]},{b["lng"]}',
-        "coord_type": "bd09ll",
-        "ret_coordtype": "bd09ll",
-        "steps_info": 1,
-        "tactics": 0,  # 0=不走高速，1=最短时间，2=最短距离
-    }
+    disk_key = f"{a_lng},{a_lat},{b_lng},{b_lat}"
+    cached = _leg_disk_cache_get(disk_key)
+    if cached is not None:
+        cached[0].flags.writeable = False
+        return cached
+
+    # 注意：百度接口参数为 lat,lng；其余固定参数已预先编码
+    url = f"{DIRECTIONLITE_URL}?{_DIRECTIONLITE_FIXED_QUERY}&origin={a_lat},{a_lng}&destination={b_lat},{b_lng}"
     
     last_exception = None
     
     # 重试机制
     for attempt in range(API_RETRY_COUNT):
         try:
-            resp = requests.get(DIRECTIONLITE_URL, params=params, timeout=API_TIMEOUT)
+            resp = _http_session.get(url, timeout=API_TIMEOUT)
+            if resp.status_code == 429:
+                # 限流：按 Retry-After 等待后重试，总次数仍受 API_RETRY_COUNT 限制
+                last_exception = RuntimeError("百度地图API请求被限流（HTTP 429）")
+                if attempt < API_RETRY_COUNT - 1:
+                    delay = _retry_after_seconds(resp)
+                    print(f"[API重试] 第 {attempt + 1} 次请求被限流，{delay}秒后重试...")
+                    time.sleep(delay)
+                    continue
+                else:
+                    raise last_exception
             resp.raise_for_status()
-            data = resp.json()
+            data = app.json.loads(resp.content)  # orjson 可用时直接解析字节，跳过编码检测
             
             # 检查API返回状态
             if data.get("status") != 0:
@@ -638,20 +1057,9 @@ def _call_driving_leg(a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[List[List[f
                 print(f"[API重试] 第 {attempt + 1} 次请求成功")
             
             # 解析路线点
-            poly = []
-            for st in route.get("steps", []) or []:
-                path = st.get("path", "")
-                if not path:
-                    continue
-                # path格式: "lng,lat;lng,lat;..."
-                for pair in path.split(";"):
-                    if not pair or "," not in pair:
-                        continue
-                    try:
-                        lng_s, lat_s = pair.split(",", 1)
-                        poly.append([float(lng_s), float(lat_s)])
-                    except ValueError:
-                        continue  # 跳过无效的坐标点
+            poly = _parse_step_paths(route.get("steps", []))
+            _leg_disk_cache_put(disk_key, poly, dist, dur)
+            poly.flags.writeable = False  # 结果被缓存共享，禁止修改
             
             return poly, dist, dur
             
@@ -697,23 +1105,18 @@ def _call_driving_leg(a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[List[List[f
     else:
         raise RuntimeError("百度地图API请求失败：未知错误")
 
-    # 解析路线点
-    poly = []
-    for st in route.get("steps", []) or []:
-        path = st.get("path", "")
-        if not path:
-            continue
-        # path格式: "lng,lat;lng,lat;..."
-        for pair in path.split(";"):
-            if not pair or "," not in pair:
-                continue
-            try:
-                lng_s, lat_s = pair.split(",", 1)
-                poly.append([float(lng_s), float(lat_s)])
-            except ValueError:
-                continue  # 跳过无效的坐标点
 
-    return poly, dist, dur
+def _get_route_leg(a: Dict[str, Any], b: Dict[str, Any], straight: Optional[float] = None) -> Tuple[np.ndarray, int, int]:
+    """
+    获取路线中一个路段的 (polyline, 距离, 时间)
+    起终点几乎重合（如Excel中的重复网点）时直接按直线生成，不调用百度API
+    straight 为已批量算好的起终点直线距离（米），未提供时单独计算
+    """
+    if straight is None:
+        straight = _calculate_straight_distance(a, b)
+    if straight < SHORT_LEG_THRESHOLD_M:
+        return np.array([[a["lng"], a["lat"]], [b["lng"], b["lat"]]]), int(round(straight)), 0
+    return _call_driving_leg(a, b)
 
 
 def _format_distance_m(m: int) -> str:
@@ -723,8 +1126,8 @@ def _format_distance_m(m: int) -> str:
 
 
 def _format_duration_s(s: int) -> str:
-    h = s // 3600
-    mm = (s % 3600) // 60
+    h, rem = divmod(s, 3600)
+    mm = rem // 60
     if h > 0:
         return f"{h}小时{mm}分钟"
     return f"{mm}分钟"
@@ -733,98 +1136,463 @@ def _format_duration_s(s: int) -> str:
 def _calculate_straight_distance(loc1: Dict[str, Any], loc2: Dict[str, Any]) -> float:
     """
     计算两个网点之间的直线距离（米）
-    使用Haversine公式计算球面距离
+    使用Haversine公式计算球面距离（asin 形式，与 _haversine_block 一致）
     """
-    # 地球半径（米）
-    R = 6371000
-    
     lat1 = math.radians(loc1["lat"])
     lat2 = math.radians(loc2["lat"])
-    delta_lat = math.radians(loc2["lat"] - loc1["lat"])
+    delta_lat = lat2 - lat1
     delta_lng = math.radians(loc2["lng"] - loc1["lng"])
     
     a = math.sin(delta_lat / 2) ** 2 + \
         math.cos(lat1) * math.cos(lat2) * math.sin(delta_lng / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     
-    return R * c
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _convex_hull_indices(x: np.ndarray, y: np.ndarray) -> List[int]:
+    """
+    计算平面点集的凸包顶点下标（Andrew 单调链算法，O(n log n)）
+    共线点不计入凸包
+    """
+    order = np.lexsort((y, x)).tolist()
+
+    def cross(o, a, b):
+        return (x[a] - x[o]) * (y[b] - y[o]) - (y[a] - y[o]) * (x[b] - x[o])
+
+    lower: List[int] = []
+    for k in order:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], k) <= 0:
+            lower.pop()
+        lower.append(k)
+
+    upper: List[int] = []
+    for k in reversed(order):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], k) <= 0:
+            upper.pop()
+        upper.append(k)
+
+    return lower[:-1] + upper[:-1]
+
+
+def _haversine_term_block(lat_a: np.ndarray, lng_a: np.ndarray, lat_b: np.ndarray, lng_b: np.ndarray) -> np.ndarray:
+    """
+    计算两组弧度坐标之间Haversine公式中的中间量 a（取值 [0, 1]），形状为 (len(a), len(b))
+    距离 = 2R·asin(√a) 随 a 单调递增，只需比较大小时可省去 asin 和 sqrt
+    """
+    dlat = lat_a[:, None] - lat_b[None, :]
+    dlng = lng_a[:, None] - lng_b[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_a)[:, None] * np.cos(lat_b)[None, :] * np.sin(dlng / 2) ** 2
+    return np.clip(a, 0.0, 1.0, out=a)
+
+
+def _haversine_block(lat_a: np.ndarray, lng_a: np.ndarray, lat_b: np.ndarray, lng_b: np.ndarray) -> np.ndarray:
+    """
+    计算两组弧度坐标之间的Haversine距离矩阵（米），形状为 (len(a), len(b))
+    """
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(_haversine_term_block(lat_a, lng_a, lat_b, lng_b)))
+
+
+def _haversine_paired(lat_a: np.ndarray, lng_a: np.ndarray, lat_b: np.ndarray, lng_b: np.ndarray) -> np.ndarray:
+    """
+    逐元素计算两组等长弧度坐标之间的Haversine距离（米），即 a[k] 到 b[k] 的距离
+    """
+    a = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lng_b - lng_a) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _haversine_matrix_kernel(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """
+    计算弧度坐标之间的Haversine距离方阵（米），逐元素循环写法，供 numba 编译
+    """
+    n = lat.shape[0]
+    out = np.empty((n, n))
+    for i in prange(n):
+        cos_i = math.cos(lat[i])
+        for j in range(n):
+            s_lat = math.sin((lat[j] - lat[i]) / 2)
+            s_lng = math.sin((lng[j] - lng[i]) / 2)
+            a = s_lat * s_lat + cos_i * math.cos(lat[j]) * s_lng * s_lng
+            out[i, j] = 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(max(a, 0.0), 1.0)))
+    return out
+
+
+def _two_opt_kernel(order: np.ndarray, dist: np.ndarray, max_sweeps: int, eps: float) -> np.ndarray:
+    """
+    2-opt 局部优化的逐元素循环写法，供 numba 编译；逻辑与 _two_opt_order 的 NumPy 实现一致
+    """
+    n = order.shape[0]
+    for _ in range(max_sweeps):
+        improved = False
+        for i in range(1, n - 1):
+            prev = order[i - 1]
+            first = order[i]
+            best_delta = 0.0
+            best_j = -1
+            for j in range(i + 1, n):
+                last = order[j]
+                delta = dist[prev, last] - dist[prev, first]
+                if j < n - 1:
+                    nxt = order[j + 1]
+                    delta += dist[first, nxt] - dist[last, nxt]
+                if best_j < 0 or delta < best_delta:
+                    best_delta = delta
+                    best_j = j
+            if best_delta < -eps:
+                lo, hi = i, best_j
+                while lo < hi:
+                    order[lo], order[hi] = order[hi], order[lo]
+                    lo += 1
+                    hi -= 1
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def _nearest_neighbor_kernel(dist: np.ndarray, start_idx: int) -> np.ndarray:
+    """
+    最近邻排序的逐元素循环写法，供 numba 编译；逻辑与 _nearest_neighbor_order 的 NumPy 实现一致
+    """
+    n = dist.shape[0]
+    visited = np.zeros(n, dtype=np.bool_)
+    order = np.empty(n, dtype=np.int64)
+    order[0] = start_idx
+    visited[start_idx] = True
+    for k in range(1, n):
+        row = dist[order[k - 1]]
+        best_j = -1
+        best_d = np.inf
+        for j in range(n):
+            if not visited[j] and (best_j < 0 or row[j] < best_d):
+                best_d = row[j]
+                best_j = j
+        order[k] = best_j
+        visited[best_j] = True
+    return order
+
+
+def _farthest_pair_kernel(lat: np.ndarray, lng: np.ndarray) -> Tuple[int, int, float]:
+    """
+    最远点对搜索的逐元素循环写法（只遍历 j > i），供 numba 编译；逻辑与 _farthest_pair_indices 一致
+    外层循环按行并行，每行记录自己的最大值，最后再归约，避免线程间共享累加变量
+    比较的是Haversine中间量 a（与距离单调对应），只对最终结果求 asin
+    """
+    n = lat.shape[0]
+    cos_lat = np.cos(lat)
+    row_best = np.zeros(n)
+    row_j = np.full(n, -1, dtype=np.int64)
+    for i in prange(n):
+        best = 0.0
+        best_j = -1
+        for j in range(i + 1, n):
+            s_lat = math.sin((lat[j] - lat[i]) / 2)
+            s_lng = math.sin((lng[j] - lng[i]) / 2)
+            a = s_lat * s_lat + cos_lat[i] * cos_lat[j] * s_lng * s_lng
+            if a > best:
+                best = a
+                best_j = j
+        row_best[i] = best
+        row_j[i] = best_j
+
+    best_i = -1
+    max_term = 0.0
+    for i in range(n):
+        if row_best[i] > max_term:
+            max_term = row_best[i]
+            best_i = i
+    if best_i < 0:
+        return -1, -1, 0.0
+    return best_i, row_j[best_i], 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(max_term, 1.0)))
+
+
+if NUMBA_AVAILABLE:
+    # cache=True 将编译结果缓存到磁盘，只有首次运行需要编译
+    _haversine_matrix_kernel = njit(parallel=True, fastmath=True, cache=True)(_haversine_matrix_kernel)
+    _two_opt_kernel = njit(fastmath=True, cache=True)(_two_opt_kernel)
+    _nearest_neighbor_kernel = njit(cache=True)(_nearest_neighbor_kernel)
+    _farthest_pair_kernel = njit(parallel=True, fastmath=True, cache=True)(_farthest_pair_kernel)
+
+
+def _farthest_pair_indices(lat: np.ndarray, lng: np.ndarray) -> Tuple[int, int, float]:
+    """
+    在弧度坐标数组中找出Haversine距离最大的点对
+    返回：(下标i, 下标j, 距离(米))；不存在距离大于0的点对时下标为 -1
+    """
+    if NUMBA_AVAILABLE:
+        i, j, d = _farthest_pair_kernel(lat, lng)
+        return int(i), int(j), float(d)
+
+    n = lat.shape[0]
+
+    max_term = 0.0
+    best_i = best_j = -1
+
+    for start in range(0, n, FARTHEST_CHUNK_SIZE):
+        stop = min(start + FARTHEST_CHUNK_SIZE, n)
+        # 只与 start 之后的列比较（之前的列已在前面的分块中算过），块内再清零 j <= i 的部分
+        # 按 Haversine 中间量 a 比较大小（与距离单调对应），只对最终结果求距离
+        h = _haversine_term_block(lat[start:stop], lng[start:stop], lat[start:], lng[start:])
+        h[np.tril_indices(stop - start)] = 0.0
+
+        i, j = np.unravel_index(h.argmax(), h.shape)
+        if h[i, j] > max_term:
+            max_term = float(h[i, j])
+            best_i, best_j = start + int(i), start + int(j)
+
+    if best_i < 0:
+        return -1, -1, 0.0
+    return best_i, best_j, 2 * EARTH_RADIUS_M * math.asin(math.sqrt(max_term))
+
+
+def _normalize_locs(locs: List[Any]) -> List[Dict[str, Any]]:
+    """
+    验证并格式化前端提交的网点数据
+    
+    Returns:
+        网点列表，每个网点包含：lng, lat, name, remark
+    
+    Raises:
+        ValueError: 某个网点缺少经纬度或格式错误（信息中包含网点序号）
+    """
+    # 快速路径：经纬度整列交给 NumPy 转换；出现任何异常或 NaN（如 None）时退回逐个校验，以给出准确的出错序号
+    try:
+        lngs = np.array([p["lng"] for p in locs], dtype=np.float64)
+        lats = np.array([p["lat"] for p in locs], dtype=np.float64)
+        if lngs.shape == lats.shape == (len(locs),) and not (np.isnan(lngs).any() or np.isnan(lats).any()):
+            return [
+                {"lng": lng, "lat": lat, "name": str(p.get("name", "")).strip(), "remark": str(p.get("remark", "")).strip()}
+                for p, lng, lat in zip(locs, lngs.tolist(), lats.tolist())
+            ]
+    except (KeyError, ValueError, TypeError, AttributeError, OverflowError):
+        pass
+
+    out = []
+    append = out.append
+    for idx, p in enumerate(locs):
+        try:
+            append({
+                "lng": float(p["lng"]),
+                "lat": float(p["lat"]),
+                "name": str(p.get("name", "")).strip(),
+                "remark": str(p.get("remark", "")).strip(),
+            })
+        except (KeyError, ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"第{idx+1}个网点数据格式错误: {str(e)}") from e
+    return out
+
+
+class LocSet:
+    """
+    网点集合的列式（SoA）表示：经纬度保存为连续的 float64 数组，供距离计算等数值代码直接使用
+    原始网点字典只在需要返回给前端时按下标取出；重新排序用 take()，直接对数组做下标索引
+    """
+    __slots__ = ("items", "lng", "lat", "lng_rad", "lat_rad", "name", "_dist")
+
+    def __init__(self, locs: List[Dict[str, Any]]):
+        n = len(locs)
+        self.items = locs
+        self.lng = np.fromiter((p["lng"] for p in locs), dtype=np.float64, count=n)
+        self.lat = np.fromiter((p["lat"] for p in locs), dtype=np.float64, count=n)
+        self.lng_rad = np.radians(self.lng)
+        self.lat_rad = np.radians(self.lat)
+        self.name = [p["name"] for p in locs]
+        self._dist = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def take(self, order) -> "LocSet":
+        """按给定下标顺序返回新的网点集合（数组直接索引，不再从字典中提取坐标）"""
+        order = np.asarray(order, dtype=np.int64)
+        ls = LocSet.__new__(LocSet)
+        ls.items = [self.items[i] for i in order.tolist()]
+        ls.lng = self.lng[order]
+        ls.lat = self.lat[order]
+        ls.lng_rad = self.lng_rad[order]
+        ls.lat_rad = self.lat_rad[order]
+        ls.name = [self.name[i] for i in order.tolist()]
+        ls._dist = None
+        return ls
+
+    def distance_matrix(self) -> np.ndarray:
+        """两两Haversine距离矩阵（米），首次调用时计算，之后最近邻与 2-opt 共用"""
+        if self._dist is None:
+            if NUMBA_AVAILABLE:
+                self._dist = _haversine_matrix_kernel(self.lat_rad, self.lng_rad)
+            else:
+                self._dist = _haversine_block(self.lat_rad, self.lng_rad, self.lat_rad, self.lng_rad)
+        return self._dist
 
 
-def _find_farthest_points(locs: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+def _find_farthest_points(ls: LocSet) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], float]]:
     """
     找到两个最远的网点
+    最远点对一定位于凸包上：网点较多时先在等距投影平面上求凸包，
+    只对凸包顶点计算Haversine距离（城市级范围内投影误差可忽略）
+    结果只与网点坐标集合有关，与顺序无关，按坐标集合缓存
     返回：(点1, 点2, 直线距离(米))
     """
-    if len(locs) < 2:
+    n = len(ls)
+    if n < 2:
         return None
-    
-    max_dist = 0
-    farthest_pair = None
-    
-    for i in range(len(locs)):
-        for j in range(i + 1, len(locs)):
-            dist = _calculate_straight_distance(locs[i], locs[j])
-            if dist > max_dist:
-                max_dist = dist
-                farthest_pair = (locs[i], locs[j], dist)
-    
-    return farthest_pair
+
+    coords = list(zip(ls.lng.tolist(), ls.lat.tolist()))
+    cache_key = frozenset(coords)
+    with _farthest_cache_lock:
+        cached = _farthest_cache.get(cache_key)
+    if cached is not None:
+        p1, p2, max_dist = cached
+        return ls.items[coords.index(p1)], ls.items[coords.index(p2)], max_dist
+
+    lat, lng = ls.lat_rad, ls.lng_rad
+
+    candidates = np.arange(n)
+    if n >= FARTHEST_HULL_MIN_POINTS:
+        hull = _convex_hull_indices(lng * np.cos(lat.mean()), lat)
+        if len(hull) >= 2:
+            candidates = np.asarray(hull)
+
+    i, j, max_dist = _farthest_pair_indices(lat[candidates], lng[candidates])
+    if i < 0:
+        return None
+    i, j = int(candidates[i]), int(candidates[j])
+
+    with _farthest_cache_lock:
+        if len(_farthest_cache) >= FARTHEST_CACHE_SIZE:
+            _farthest_cache.pop(next(iter(_farthest_cache)))
+        _farthest_cache[cache_key] = (coords[i], coords[j], max_dist)
+    return ls.items[i], ls.items[j], max_dist
 
 
-def _nearest_neighbor_order(locs: List[Dict[str, Any]], start_name: str | None) -> List[Dict[str, Any]]:
+def _nearest_neighbor_order(ls: LocSet, start_name: str | None) -> np.ndarray:
     """
     简单最近邻：用于“优化路线”的顺序建议（不是严格TSP最优，但够实用且很快）
+    每一步在共用的距离矩阵中取当前网点所在行，屏蔽已访问网点后取最小值
+    返回：网点下标顺序
     """
-    if len(locs) <= 2:
-        return locs[:]
-
-    remaining = locs[:]
+    n = len(ls)
+    if n <= 2:
+        return np.arange(n)
 
     # 选择起点
     start_idx = 0
     if start_name:
-        for i, p in enumerate(remaining):
-            if p["name"] == start_name:
+        for i, name in enumerate(ls.name):
+            if name == start_name:
                 start_idx = i
                 break
 
-    route = [remaining.pop(start_idx)]
+    if n > DIST_MATRIX_MAX_POINTS:
+        return _nearest_neighbor_order_streaming(ls, start_idx)
+
+    dist = ls.distance_matrix()
+    if NUMBA_AVAILABLE:
+        return _nearest_neighbor_kernel(dist, start_idx)
+
+    # 已访问网点的惩罚项为 inf、未访问为 0：标记访问是 O(1) 的单元素写入，
+    # 每一步只需一次加法和一次 argmin，无需复制距离行或做布尔索引
+    penalty = np.zeros(n)
+    order = np.empty(n, dtype=np.int64)
+    order[0] = start_idx
+    penalty[start_idx] = np.inf
+    d = np.empty(n)
+
+    for k in range(1, n):
+        np.add(dist[order[k - 1]], penalty, out=d)
+        j = int(d.argmin())
+        order[k] = j
+        penalty[j] = np.inf
+
+    return order
+
 
-    def dist2(p, q):
-        dx = p["lng"] - q["lng"]
-        dy = p["lat"] - q["lat"]
-        return dx*dx + dy*dy
+def _nearest_neighbor_order_streaming(ls: LocSet, start_idx: int) -> np.ndarray:
+    """
+    大规模网点的最近邻排序：不构建距离矩阵，每一步只计算当前网点到剩余未访问网点的距离，
+    并把已访问网点从候选数组中移除，内存为 O(n)，总计算量约为完整矩阵的一半
+    """
+    n = len(ls)
+    lat, lng = ls.lat_rad, ls.lng_rad
+    order = np.empty(n, dtype=np.int64)
+    order[0] = start_idx
+    remaining = np.delete(np.arange(n), start_idx)
 
-    while remaining:
-        last = route[-1]
-        best_i = min(range(len(remaining)), key=lambda i: dist2(last, remaining[i]))
-        route.append(remaining.pop(best_i))
+    for k in range(1, n):
+        cur = order[k - 1]
+        d = _haversine_paired(lat[cur], lng[cur], lat[remaining], lng[remaining])
+        pos = int(d.argmin())
+        order[k] = remaining[pos]
+        remaining = np.delete(remaining, pos)
 
-    return route
+    return order
 
 
-def _build_route_result(route: List[Dict[str, Any]]) -> Dict[str, Any]:
-    polyline_all: List[List[float]] = []
+def _two_opt_order(ls: LocSet, order: np.ndarray, max_sweeps: int = TWO_OPT_MAX_SWEEPS) -> np.ndarray:
+    """
+    对最近邻得到的路线做 2-opt 局部优化（起点保持不变，终点不限）
+    基于Haversine距离矩阵，每次翻转一段子路线以缩短总直线距离，直到没有改进或达到最大轮数
+    返回：优化后的网点下标顺序
+    """
+    order = np.array(order, dtype=np.int64)
+    n = len(order)
+    if n <= 3 or n > DIST_MATRIX_MAX_POINTS:
+        return order
+
+    eps = 1e-6
+    dist = ls.distance_matrix()
+    if NUMBA_AVAILABLE:
+        return _two_opt_kernel(order, dist, max_sweeps, eps)
+
+    for _ in range(max_sweeps):
+        improved = False
+        for i in range(1, n - 1):
+            # 翻转 order[i..j]：边 (i-1,i)、(j,j+1) 替换为 (i-1,j)、(i,j+1)；j 为终点时没有后一条边
+            js = np.arange(i + 1, n)
+            prev, first = order[i - 1], order[i]
+            last = order[js]
+            nxt = order[np.minimum(js + 1, n - 1)]
+            has_next = js < n - 1
+            delta = (dist[prev, last] - dist[prev, first]
+                     + np.where(has_next, dist[first, nxt] - dist[last, nxt], 0.0))
+            k = int(delta.argmin())
+            if delta[k] < -eps:
+                j = int(js[k])
+                order[i:j + 1] = order[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+
+    return order
+
+
+def _build_route_result(locset: LocSet) -> Dict[str, Any]:
+    route = locset.items
+    poly_chunks: List[np.ndarray] = []  # 各路段polyline分块收集，最后一次性拼接
+    last_point = None
     legs = []
     total_distance = 0
     total_duration = 0
-    leg_polylines = []  # 保存每个路段的polyline，用于计算中点
 
-    for i in range(len(route) - 1):
-        a, b = route[i], route[i + 1]
-        poly, dist, dur = _call_driving_leg(a, b)
-        if polyline_all and poly:
+    # 一次性算出相邻网点的直线距离（用于跳过几乎重合的路段）
+    straights = _haversine_paired(
+        locset.lat_rad[:-1], locset.lng_rad[:-1], locset.lat_rad[1:], locset.lng_rad[1:]
+    ).tolist()
+
+    # 各路段互相独立，并发请求后按原顺序拼接
+    pairs = list(zip(route, route[1:], straights))
+    leg_results = list(_leg_executor.map(lambda abd: _get_route_leg(*abd), pairs))
+
+    for (a, b, _), (poly, dist, dur) in zip(pairs, leg_results):
+        if last_point is not None and len(poly):
             # 去重拼接点
-            if polyline_all[-1] == poly[0]:
+            if poly[0, 0] == last_point[0] and poly[0, 1] == last_point[1]:
                 poly = poly[1:]
-        polyline_all.extend(poly)
-        leg_polylines.append(poly)
-
-        # 计算当前路段的中点坐标
+        # 当前路段的中点坐标（用于标注距离）
         mid_point = None
-        if poly and len(poly) > 0:
-            mid_idx = len(poly) // 2
-            mid_point = poly[mid_idx]
+        if len(poly):
+            poly_chunks.append(poly)
+            last_point = poly[-1]
+            mid_point = poly[len(poly) // 2].tolist()
 
         legs.append({
             "from": a["name"],
@@ -838,9 +1606,14 @@ def _build_route_result(route: List[Dict[str, Any]]) -> Dict[str, Any]:
         total_distance += dist
         total_duration += dur
 
+    # 拼接为一个 (n, 2) 数组，orjson 可直接序列化；未安装 orjson 时转换为列表
+    polyline_all = np.concatenate(poly_chunks) if poly_chunks else np.empty((0, 2))
+    if not ORJSON_AVAILABLE:
+        polyline_all = polyline_all.tolist()
+
     # 计算最远的两个网点
     farthest_info = None
-    farthest_pair = _find_farthest_points(route)
+    farthest_pair = _find_farthest_points(locset)
     if farthest_pair:
         point1, point2, straight_dist = farthest_pair
         farthest_info = {
@@ -860,9 +1633,74 @@ def _build_route_result(route: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
+@app.after_request
+def _compress_response(resp: Response) -> Response:
+    """
+    对较大的文本类响应（路线结果的 polyline、Excel解析结果等）进行 gzip 压缩
+    """
+    if (resp.status_code != 200
+            or resp.direct_passthrough
+            or resp.mimetype not in COMPRESS_MIMETYPES
+            or "Content-Encoding" in resp.headers
+            or "gzip" not in request.headers.get("Accept-Encoding", "").lower()):
+        return resp
+
+    data = resp.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return resp
+
+    # mtime=0：同一内容每次压缩得到相同字节
+    resp.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0))
+    resp.headers["Content-Encoding"] = "gzip"
+    # 压缩后的字节与原文不同，强 ETag 改为弱 ETag（If-None-Match 按弱比较，首页仍可返回 304）
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def _json_response(obj: Any, status: int = 200) -> Response:
+    """
+    生成JSON响应
+    优先使用 orjson 序列化（路线结果中的 polyline 点数很多），键按顺序排列，与 jsonify 输出一致
+    """
+    if ORJSON_AVAILABLE:
+        body = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        return Response(body, status=status, mimetype="application/json")
+    resp = jsonify(obj)
+    resp.status_code = status
+    return resp
+
+
+def _load_json_body() -> Any:
+    """
+    解析请求体中的JSON（不检查 Content-Type）
+    请求体为空时返回 None；格式错误时抛出 ValueError
+    """
+    data = request.get_data()
+    if not data:
+        return None
+    return app.json.loads(data)
+
+
 @app.get("/")
 def home():
-    return render_template("index.html")
+    """
+    首页：页面为静态内容，渲染一次后缓存并带 ETag 返回
+    调试模式下每次重新渲染，便于修改模板后直接刷新
+    """
+    global _index_html_cache
+    if _index_html_cache is None or DEBUG_MODE:
+        html = render_template("index.html").encode("utf-8")
+        _index_html_cache = (html, hashlib.sha1(html).hexdigest())
+
+    html, etag = _index_html_cache
+    resp = Response(html, mimetype="text/html")
+    resp.set_etag(etag)
+    # 调试模式下要求浏览器每次都用 ETag 重新验证，修改模板后刷新即可生效
+    resp.headers["Cache-Control"] = "no-cache" if DEBUG_MODE else "public, max-age=300"
+    return resp.make_conditional(request)
 
 
 @app.get("/config-custom.js")
@@ -878,7 +1716,6 @@ def get_custom_config():
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            from flask import Response
             return Response(content, mimetype='application/javascript')
         except Exception as e:
             print(f"[配置] 读取config-custom.js失败: {e}")
@@ -889,6 +1726,68 @@ def get_custom_config():
         abort(404)
 
 
+def _build_upload_payload(locs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    将解析出的网点按调整、工号、网组分组，生成 /upload_excel 的响应数据
+    三种分组在同一次遍历中完成；文本字段已在 _read_excel_locations 中去除首尾空白
+    """
+    # 首先按"调整"字段分组，然后在同字段下再按工号、网组分组
+    # 结构：adjustments -> employee_id -> groups -> locations
+    adjustments: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    # 保持向后兼容：按网组分组、按工号分组（用于旧版功能）
+    groups = defaultdict(list)
+    employees: Dict[str, Dict[str, Any]] = {}
+    for loc in locs:
+        raw_employee_id = loc["employee_id"]
+        # 没有调整字段归为"未分类"，没有工号、网组归为"未分组"
+        adjustment = loc["adjustment"] or "未分类"
+        employee_id = raw_employee_id or "未分组"
+        group = loc["group"] or "未分组"
+
+        by_employee = adjustments.get(adjustment)
+        if by_employee is None:
+            by_employee = adjustments[adjustment] = {}
+        entry = by_employee.get(employee_id)
+        if entry is None:
+            entry = by_employee[employee_id] = {
+                "employee_id": employee_id,
+                "employee_name": loc["employee_name"],
+                "groups": defaultdict(list)
+            }
+        entry["groups"][group].append(loc)
+
+        groups[group].append(loc)
+
+        if raw_employee_id:
+            entry = employees.get(raw_employee_id)
+            if entry is None:
+                entry = employees[raw_employee_id] = {
+                    "employee_id": raw_employee_id,
+                    "employee_name": loc["employee_name"],
+                    "groups": defaultdict(list)
+                }
+            entry["groups"][group].append(loc)
+
+    # 转回普通字典（结果会被缓存，避免之后访问不存在的键时自动插入）
+    groups = dict(groups)
+    for by_employee in adjustments.values():
+        for entry in by_employee.values():
+            entry["groups"] = dict(entry["groups"])
+    for entry in employees.values():
+        entry["groups"] = dict(entry["groups"])
+
+    return {
+        "locations": locs,
+        "count": len(locs),
+        "groups": groups,
+        "group_count": len(groups),
+        "employees": employees,
+        "employee_count": len(employees),
+        "adjustments": adjustments,  # 新增：按调整字段分组的数据
+        "adjustment_count": len(adjustments)
+    }
+
+
 @app.post("/upload_excel")
 def upload_excel():
     """
@@ -900,90 +1799,50 @@ def upload_excel():
     try:
         f = request.files.get("file")
         if not f:
-            return jsonify({"error": "未收到文件"}), 400
+            return _json_response({"error": "未收到文件"}, 400)
 
         # 检查文件扩展名
         filename = f.filename or ""
         if not (filename.endswith('.xlsx') or filename.endswith('.xls')):
-            return jsonify({"error": "文件格式错误，请上传 .xlsx 或 .xls 文件"}), 400
-
-        locs = _read_excel_locations(f.stream)
-        if not locs:
-            return jsonify({"error": "未解析到有效网点数据（请检查经纬度、名称列）"}), 400
-
-        # 首先按"调整"字段分组，然后在同字段下再按工号、网组分组
-        # 结构：adjustments -> employee_id -> groups -> locations
-        adjustments = {}
-        for loc in locs:
-            adjustment = loc.get("adjustment", "").strip()
-            if not adjustment:
-                adjustment = "未分类"  # 如果没有调整字段，归为"未分类"
-            
-            if adjustment not in adjustments:
-                adjustments[adjustment] = {}
-            
-            employee_id = loc.get("employee_id", "").strip()
-            if not employee_id:
-                employee_id = "未分组"  # 如果没有工号，归为"未分组"
-            
-            if employee_id not in adjustments[adjustment]:
-                adjustments[adjustment][employee_id] = {
-                    "employee_id": employee_id,
-                    "employee_name": loc.get("employee_name", "").strip(),
-                    "groups": {}
-                }
-            
-            group = loc.get("group", "").strip()
-            if not group:
-                group = "未分组"  # 如果没有网组，归为"未分组"
-            
-            if group not in adjustments[adjustment][employee_id]["groups"]:
-                adjustments[adjustment][employee_id]["groups"][group] = []
-            
-            adjustments[adjustment][employee_id]["groups"][group].append(loc)
-        
-        # 保持向后兼容：按网组分组（用于旧版功能）
-        groups = {}
-        for loc in locs:
-            group = loc.get("group", "").strip()
-            if not group:
-                group = "未分组"
-            if group not in groups:
-                groups[group] = []
-            groups[group].append(loc)
-        
-        # 保持向后兼容：按工号分组（用于旧版功能）
-        employees = {}
-        for loc in locs:
-            employee_id = loc.get("employee_id", "").strip()
-            if employee_id:
-                if employee_id not in employees:
-                    employees[employee_id] = {
-                        "employee_id": employee_id,
-                        "employee_name": loc.get("employee_name", "").strip(),
-                        "groups": {}
-                    }
-                group = loc.get("group", "").strip()
-                if not group:
-                    group = "未分组"
-                if group not in employees[employee_id]["groups"]:
-                    employees[employee_id]["groups"][group] = []
-                employees[employee_id]["groups"][group].append(loc)
-        
-        return jsonify({
-            "locations": locs,
-            "count": len(locs),
-            "groups": groups,
-            "group_count": len(groups),
-            "employees": employees,
-            "employee_count": len(employees),
-            "adjustments": adjustments,  # 新增：按调整字段分组的数据
-            "adjustment_count": len(adjustments)
-        })
+            return _json_response({"error": "文件格式错误，请上传 .xlsx 或 .xls 文件"}, 400)
+
+        # 相同内容的文件直接复用上次的解析及分组结果
+        blob = f.stream.read()
+        cache_key = hashlib.sha256(blob).hexdigest()
+        with _excel_cache_lock:
+            payload = _excel_cache.get(cache_key)
+        if payload is None:
+            payload = _build_upload_payload(_read_excel_locations(io.BytesIO(blob), filename))
+            with _excel_cache_lock:
+                if len(_excel_cache) >= EXCEL_CACHE_SIZE:
+                    _excel_cache.pop(next(iter(_excel_cache)))
+                _excel_cache[cache_key] = payload
+        if not payload["count"]:
+            return _json_response({"error": "未解析到有效网点数据（请检查经纬度、名称列）"}, 400)
+
+        return _json_response(payload)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return _json_response({"error": str(e)}, 400)
     except Exception as e:
-        return jsonify({"error": f"文件处理失败: {str(e)}"}), 500
+        return _json_response({"error": f"文件处理失败: {str(e)}"}, 500)
+
+
+@app.post("/clear_cache")
+def clear_cache():
+    """
+    清空路段缓存（内存及磁盘）、Excel解析缓存、最远点对缓存和逆地理编码缓存
+    
+    Returns:
+        JSON响应，包含清理结果
+    """
+    _driving_leg_cached.cache_clear()
+    _leg_disk_cache_clear()
+    with _excel_cache_lock:
+        _excel_cache.clear()
+    with _farthest_cache_lock:
+        _farthest_cache.clear()
+    _reverse_geocode.cache_clear()
+    return _json_response({"success": True, "message": "缓存已清空"})
 
 
 @app.post("/calculate")
@@ -995,36 +1854,26 @@ def calculate():
         JSON响应，包含路线结果或error信息
     """
     try:
-        payload = request.get_json(force=True)
+        payload = _load_json_body()
         if not payload:
-            return jsonify({"error": "请求体为空"}), 400
+            return _json_response({"error": "请求体为空"}, 400)
 
         locs = payload.get("locations", [])
         if not isinstance(locs, list):
-            return jsonify({"error": "locations必须是数组"}), 400
+            return _json_response({"error": "locations必须是数组"}, 400)
         
         if len(locs) < 2:
-            return jsonify({"error": "至少需要2个网点"}), 400
+            return _json_response({"error": "至少需要2个网点"}, 400)
 
-        # 验证并格式化网点数据
-        route = []
-        for idx, p in enumerate(locs):
-            try:
-                route.append({
-                    "lng": float(p["lng"]),
-                    "lat": float(p["lat"]),
-                    "name": str(p.get("name", "")).strip(),
-                    "remark": str(p.get("remark", "")).strip(),
-                })
-            except (KeyError, ValueError, TypeError) as e:
-                return jsonify({"error": f"第{idx+1}个网点数据格式错误: {str(e)}"}), 400
+        # 验证并格式化网点数据（格式错误时抛出 ValueError）
+        route = _normalize_locs(locs)
 
         # 验证网点名称
         if any(not p["name"] for p in route):
-            return jsonify({"error": "存在空的网点名称，请检查输入"}), 400
+            return _json_response({"error": "存在空的网点名称，请检查输入"}, 400)
 
         # 计算路线
-        result = _build_route_result(route)
+        result = _build_route_result(LocSet(route))
         
         # 调试输出
         if result.get("farthest_points"):
@@ -1032,55 +1881,47 @@ def calculate():
             print(f"[calculate] 最远网点: {fp['point1']['name']} <-> {fp['point2']['name']}, "
                   f"距离: {fp['straight_distance_text']}")
         
-        return jsonify(result)
+        return _json_response(result)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return _json_response({"error": str(e)}, 400)
     except RuntimeError as e:
-        return jsonify({"error": str(e)}), 500
+        return _json_response({"error": str(e)}, 500)
     except Exception as e:
-        return jsonify({"error": f"计算失败: {str(e)}"}), 500
+        return _json_response({"error": f"计算失败: {str(e)}"}, 500)
 
 
 @app.post("/optimize")
 def optimize():
     """
-    优化路线顺序（使用最近邻算法）
+    优化路线顺序（最近邻算法生成初始路线，再用 2-opt 局部优化）
     
     Returns:
         JSON响应，包含优化后的路线结果或error信息
     """
     try:
-        payload = request.get_json(force=True)
+        payload = _load_json_body()
         if not payload:
-            return jsonify({"error": "请求体为空"}), 400
+            return _json_response({"error": "请求体为空"}, 400)
 
         locs = payload.get("locations", [])
         start_name = payload.get("start_name")
 
         if not isinstance(locs, list):
-            return jsonify({"error": "locations必须是数组"}), 400
+            return _json_response({"error": "locations必须是数组"}, 400)
         
         if len(locs) < 2:
-            return jsonify({"error": "至少需要2个网点"}), 400
+            return _json_response({"error": "至少需要2个网点"}, 400)
 
-        # 验证并格式化网点数据
-        pts = []
-        for idx, p in enumerate(locs):
-            try:
-                pts.append({
-                    "lng": float(p["lng"]),
-                    "lat": float(p["lat"]),
-                    "name": str(p.get("name", "")).strip(),
-                    "remark": str(p.get("remark", "")).strip(),
-                })
-            except (KeyError, ValueError, TypeError) as e:
-                return jsonify({"error": f"第{idx+1}个网点数据格式错误: {str(e)}"}), 400
+        # 验证并格式化网点数据（格式错误时抛出 ValueError）
+        pts = _normalize_locs(locs)
 
         # 优化路线顺序
-        route = _nearest_neighbor_order(pts, start_name if start_name else None)
+        locset = LocSet(pts)
+        order = _nearest_neighbor_order(locset, start_name if start_name else None)
+        ordered = locset.take(_two_opt_order(locset, order))
         
         # 计算路线
-        result = _build_route_result(route)
+        result = _build_route_result(ordered)
         
         # 调试输出
         if result.get("farthest_points"):
@@ -1088,13 +1929,31 @@ def optimize():
             print(f"[optimize] 最远网点: {fp['point1']['name']} <-> {fp['point2']['name']}, "
                   f"距离: {fp['straight_distance_text']}")
         
-        return jsonify(result)
+        return _json_response(result)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return _json_response({"error": str(e)}, 400)
     except RuntimeError as e:
-        return jsonify({"error": str(e)}), 500
+        return _json_response({"error": str(e)}, 500)
     except Exception as e:
-        return jsonify({"error": f"优化失败: {str(e)}"}), 500
+        return _json_response({"error": f"优化失败: {str(e)}"}, 500)
+
+
+# 截图目录名允许的标点；ASCII 范围内其余非字母数字字符预先建成删除表，用 str.translate 一次去除
+_PATH_PART_PUNCT = "-_ "
+_PATH_PART_DELETE_TABLE = str.maketrans("", "", "".join(
+    ch for ch in map(chr, range(128)) if not (ch.isalnum() or ch in _PATH_PART_PUNCT)
+))
+
+
+def _sanitize_path_part(text: str) -> str:
+    """
+    清理工号、姓名、调整字段，使其可作为目录名：只保留字母数字（含中文）及 - _ 空格，空格替换为下划线
+    """
+    text = text.strip().translate(_PATH_PART_DELETE_TABLE)
+    # 剩余字符通常全是字母数字（含中文）；仅当还含有非ASCII标点等字符时才逐字符过滤
+    if text and not text.replace("-", "").replace("_", "").replace(" ", "").isalnum():
+        text = "".join(c for c in text if c.isalnum() or c in _PATH_PART_PUNCT)
+    return text.strip().replace(" ", "_")
 
 
 @app.post("/capture_screenshot")
@@ -1107,10 +1966,10 @@ def capture_screenshot_endpoint():
         JSON响应，包含截图文件路径或error信息
     """
     try:
-        from jietu import capture_screenshot_sync
+        capture_screenshot_sync = _get_capture_screenshot_sync()
         
         # 获取请求中的UI状态
-        data = request.get_json() or {}
+        data = _load_json_body() or {}
         ui_state = data.get('ui_state', {})
         
         # 获取网组名称、工号、姓名、调整（用于截图文件命名和路径）
@@ -1137,13 +1996,13 @@ def capture_screenshot_endpoint():
             
             # 如果有工号和姓名，创建子文件夹
             if employee_id and employee_id.strip() and employee_name and employee_name.strip():
-                safe_employee_id = "".join(c for c in employee_id.strip() if c.isalnum() or c in ('-', '_', ' ')).strip().replace(' ', '_')
-                safe_employee_name = "".join(c for c in employee_name.strip() if c.isalnum() or c in ('-', '_', ' ')).strip().replace(' ', '_')
+                safe_employee_id = _sanitize_path_part(employee_id)
+                safe_employee_name = _sanitize_path_part(employee_name)
                 save_dir = os.path.join(base_save_dir, f"{safe_employee_id}-{safe_employee_name}")
                 
                 # 如果有调整字段，在工号-姓名目录下再创建调整字段子目录
                 if adjustment and adjustment.strip():
-                    safe_adjustment = "".join(c for c in adjustment.strip() if c.isalnum() or c in ('-', '_', ' ')).strip().replace(' ', '_')
+                    safe_adjustment = _sanitize_path_part(adjustment)
                     save_dir = os.path.join(save_dir, safe_adjustment)
             else:
                 save_dir = base_save_dir
@@ -1184,12 +2043,12 @@ def capture_screenshot_endpoint():
                         # 只有在页面确实不在应用页面时，才刷新
                         print(f"[截图API] 页面未加载应用，正在导航到: {url}")
                         driver_instance.get(url)
-                        time.sleep(1)
+                        _wait_for_app_page(driver_instance)
                 except Exception as check_e:
                     # 如果检查失败，尝试导航到目标URL
                     print(f"[截图API] 检查页面状态失败: {check_e}，尝试导航到: {url}")
                     driver_instance.get(url)
-                    time.sleep(1)
+                    _wait_for_app_page(driver_instance)
         except Exception as e:
             error_msg = f"检查浏览器窗口时出错: {str(e)}。请确保浏览器窗口保持打开状态。"
             print(f"[截图API] ❌ {error_msg}")
@@ -1257,6 +2116,96 @@ def capture_screenshot_endpoint():
         return jsonify({"error": f"截图失败: {str(e)}"}), 500
 
 
+class _GeocodeStatusError(Exception):
+    """百度返回非0状态码：携带原始数据，且不进入缓存（配额超限等可能是临时错误）"""
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data.get("status"))
+        self.data = data
+
+
+@functools.lru_cache(maxsize=GEOCODE_CACHE_SIZE)
+def _reverse_geocode(lng: float, lat: float) -> Dict[str, Any]:
+    """
+    调用百度逆地理编码API，返回解析后的JSON（进程内缓存）
+    调用方应先按 GEOCODE_CACHE_PRECISION 取整坐标，使邻近的重复点命中同一缓存项
+    """
+    # 注意：百度API参数为 lat,lng
+    url = f"{GEOCODING_URL}?{_GEOCODING_FIXED_QUERY}&location={lat},{lng}"
+    resp = _http_session.get(url, timeout=API_TIMEOUT)
+    resp.raise_for_status()
+    data = app.json.loads(resp.content)
+    if data.get("status") != 0:
+        raise _GeocodeStatusError(data)
+    return data
+
+
+def _safe_reverse_geocode(point: Tuple[Any, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+    """线程池任务：返回 (数据, 异常)，单点失败不影响其他点"""
+    lng, lat = point
+    try:
+        return _reverse_geocode(
+            round(float(lng), GEOCODE_CACHE_PRECISION),
+            round(float(lat), GEOCODE_CACHE_PRECISION),
+        ), None
+    except _GeocodeStatusError as e:
+        return e.data, None
+    except Exception as e:
+        return None, e
+
+
+def _district_entry(point: Tuple[Any, Any],
+                    result: Tuple[Optional[Dict[str, Any]], Optional[Exception]]) -> Dict[str, Any]:
+    """根据单点逆地理编码结果生成行政区信息条目（成功、未知区域或查询失败）"""
+    lng, lat = point
+    data, err = result
+    if err is not None:
+        print(f"[行政区查询] 查询失败 ({lng}, {lat}): {err}")
+        return {
+            "lng": lng,
+            "lat": lat,
+            "district": "查询失败",
+            "province": "",
+            "city": "",
+            "district_level": ""
+        }
+
+    if data.get("status") != 0 or "result" not in data:
+        return {
+            "lng": lng,
+            "lat": lat,
+            "district": "未知区域",
+            "province": "",
+            "city": "",
+            "district_level": ""
+        }
+
+    address_component = data["result"].get("addressComponent", {})
+    # 提取行政区信息：省+市+区县
+    province = address_component.get("province", "")
+    city = address_component.get("city", "")
+    district = address_component.get("district", "")
+
+    # 组合成完整行政区名称（如：江苏南京市建邺区）
+    if province and city and district:
+        district_name = f"{province}{city}{district}"
+    elif province and district:
+        district_name = f"{province}{district}"
+    elif district:
+        district_name = district
+    else:
+        district_name = "未知区域"
+
+    return {
+        "lng": lng,
+        "lat": lat,
+        "district": district_name,
+        "province": province,
+        "city": city,
+        "district_level": district
+    }
+
+
 @app.post("/get_district_boundary")
 def get_district_boundary():
     """
@@ -1270,92 +2219,32 @@ def get_district_boundary():
         JSON响应，包含每个坐标点对应的行政区信息
     """
     try:
-        payload = request.get_json(force=True)
+        payload = _load_json_body()
         if not payload:
-            return jsonify({"error": "请求体为空"}), 400
+            return _json_response({"error": "请求体为空"}, 400)
         
         locations = payload.get("locations", [])
         if not isinstance(locations, list):
-            return jsonify({"error": "locations必须是数组"}), 400
+            return _json_response({"error": "locations必须是数组"}, 400)
         
         _require_ak()
         
-        district_info = []
-        
-        for loc in locations:
-            lng = loc.get("lng")
-            lat = loc.get("lat")
-            
-            if lng is None or lat is None:
-                continue
-            
-            # 调用逆地理编码API获取行政区信息
-            params = {
-                "ak": BAIDU_WEB_AK,
-                "location": f"{lat},{lng}",  # 注意：百度API参数为 lat,lng
-                "output": "json",
-                "coordtype": "bd09ll",
-                "extensions_poi": 0,
-                "extensions_road": 0,
-                "extensions_town": 1,  # 返回乡镇信息
-            }
-            
-            try:
-                resp = requests.get(GEOCODING_URL, params=params, timeout=API_TIMEOUT)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                if data.get("status") == 0 and "result" in data:
-                    address_component = data["result"].get("addressComponent", {})
-                    # 提取行政区信息：省+市+区县
-                    province = address_component.get("province", "")
-                    city = address_component.get("city", "")
-                    district = address_component.get("district", "")
-                    
-                    # 组合成完整行政区名称（如：江苏南京市建邺区）
-                    if province and city and district:
-                        district_name = f"{province}{city}{district}"
-                    elif province and district:
-                        district_name = f"{province}{district}"
-                    elif district:
-                        district_name = district
-                    else:
-                        district_name = "未知区域"
-                    
-                    district_info.append({
-                        "lng": lng,
-                        "lat": lat,
-                        "district": district_name,
-                        "province": province,
-                        "city": city,
-                        "district_level": district
-                    })
-                else:
-                    district_info.append({
-                        "lng": lng,
-                        "lat": lat,
-                        "district": "未知区域",
-                        "province": "",
-                        "city": "",
-                        "district_level": ""
-                    })
-            except Exception as e:
-                print(f"[行政区查询] 查询失败 ({lng}, {lat}): {e}")
-                district_info.append({
-                    "lng": lng,
-                    "lat": lat,
-                    "district": "查询失败",
-                    "province": "",
-                    "city": "",
-                    "district_level": ""
-                })
-        
-        return jsonify({
+        points = [
+            (loc.get("lng"), loc.get("lat"))
+            for loc in locations
+            if loc.get("lng") is not None and loc.get("lat") is not None
+        ]
+
+        # 逆地理编码请求并发提交到共享线程池（复用连接池，总并发受 API_MAX_WORKERS 限制）
+        results = _leg_executor.map(_safe_reverse_geocode, points)
+        district_info = [_district_entry(point, result) for point, result in zip(points, results)]
+
+        return _json_response({
             "success": True,
             "districts": district_info
         })
     except Exception as e:
-        return jsonify({"error": f"获取行政区信息失败: {str(e)}"}), 500
+        return _json_response({"error": f"获取行政区信息失败: {str(e)}"}, 500)
 
 
 if __name__ == "__main__":
@@ -1381,6 +2270,12 @@ if __name__ == "__main__":
         print("=" * 60)
         print()
         
+        # --fresh-profile：清空持久化的浏览器配置目录（用于排查浏览器缓存问题）
+        if "--fresh-profile" in sys.argv:
+            import shutil
+            shutil.rmtree(EDGE_PROFILE_DIR, ignore_errors=True)
+            print(f"✓ 已清空浏览器配置目录: {EDGE_PROFILE_DIR}")
+        
         # 检查端口是否可用，如果被占用则自动查找可用端口
         actual_port = PORT
         if not _is_port_available(HOST, PORT):
@@ -1401,10 +2296,12 @@ if __name__ == "__main__":
         # 使用 Selenium 打开浏览器的函数（使用闭包捕获 actual_port）
         def open_browser():
             """延迟打开浏览器，确保服务器已启动，使用 Selenium 打开浏览器供截图功能复用"""
-            time.sleep(1.5)  # 等待服务器启动
             url = f"http://{HOST}:{actual_port}"
+            # 等待服务器开始监听后再打开浏览器
+            if not _wait_for_port(HOST, actual_port):
+                print(f"⚠️ 等待服务器启动超时，仍尝试打开浏览器: {url}")
             
-            if not SELENIUM_AVAILABLE:
+            if not _ensure_selenium():
                 print(f"⚠️ Selenium 未安装，无法自动打开浏览器")
                 print(f"   请手动访问: {url}")
                 return
@@ -1482,6 +2379,8 @@ if __name__ == "__main__":
         print(f"📍 访问地址: http://{HOST}:{actual_port}")
         print(f"🔑 API密钥: {'已配置' if BAIDU_WEB_AK else '未配置'}")
         print(f"🐛 调试模式: {'开启' if DEBUG_MODE else '关闭'}")
+        use_waitress = WAITRESS_AVAILABLE and not DEBUG_MODE
+        print(f"🖥️ 服务器: {f'waitress（{SERVER_THREADS} 线程）' if use_waitress else 'Flask 开发服务器（多线程）'}")
         print("=" * 60)
         print("💡 提示：按 Ctrl+C 停止服务器")
         print("=" * 60)
@@ -1490,9 +2389,13 @@ if __name__ == "__main__":
         browser_thread = threading.Thread(target=open_browser, daemon=True)
         browser_thread.start()
         
-        # 启动Flask服务器
+        # 启动服务器（非调试模式优先使用 waitress，多线程并发处理请求）
         try:
-            app.run(host=HOST, port=actual_port, debug=DEBUG_MODE, use_reloader=False)
+            if use_waitress:
+                waitress_serve(app, host=HOST, port=actual_port, threads=SERVER_THREADS, connection_limit=128)
+            else:
+                # 显式开启多线程，多个 /calculate 请求的百度API等待可以互相重叠
+                app.run(host=HOST, port=actual_port, debug=DEBUG_MODE, use_reloader=False, threaded=True)
         except OSError as e:
             if "Address already in use" in str(e) or "address is already in use" in str(e).lower():
                 print(f"\n❌ 错误：端口 {actual_port} 已被占用")
@@ -206,7 +206,8 @@ def process_excel_file(excel_path: Path, output_dir: Path) -> bool:
     try:
         # 读取Excel文件
         print(f"正在读取Excel文件: {excel_path.name}")
-        df = pd.read_excel(excel_path)
+        # 只用到第一列，其余列不解析
+        df = pd.read_excel(excel_path, usecols=[0])
         
         if df.empty:
             print("⚠️ Excel文件为空")
@@ -221,9 +222,9 @@ def process_excel_file(excel_path: Path, output_dir: Path) -> bool:
         success_count = 0
         fail_count = 0
         
-        # 遍历每一行
-        for idx, row in df.iterrows():
-            text = str(row.iloc[0]).strip()
+        # 遍历每一行（直接取第一列的值列表，避免 iterrows 为每行构造 Series）
+        for idx, value in enumerate(df[first_column].tolist()):
+            text = str(value).strip()
             
             if not text or text == 'nan':
                 print(f"  跳过第 {idx + 1} 行（内容为空）")
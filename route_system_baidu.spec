@@ -20,10 +20,13 @@ a = Analysis(
         'numpy.random._generator',
         'numpy.random._bounded_integers',
         'openpyxl',
+        'python_calamine',
         'flask',
+        'waitress',
         'werkzeug',
         'jinja2',
         'requests',
+        'orjson',
         'selenium',
         'selenium.webdriver',
         'selenium.webdriver.edge',
@@ -0,0 +1,75 @@
+# tests/test_baidu_retry.py
+"""
+百度API请求重试次数测试：限流及服务端错误只在 _driving_leg_cached 的重试循环中重试，
+连接层不再叠加重试（每个路段最多 API_RETRY_COUNT 次 HTTP 请求）
+"""
+
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    """对所有请求返回固定状态码，并记录收到的请求数"""
+
+    status = 429
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        body = b'{"status": 302, "message": "limited"}'
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DrivingLegRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        _StatusHandler.hits = 0
+        self.server = HTTPServer(("127.0.0.1", 0), _StatusHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{self.server.server_port}/directionlite"
+        patches = [
+            mock.patch.object(app, "DIRECTIONLITE_URL", url),
+            mock.patch.object(app, "API_RETRY_DELAY", 0),
+            # 跳过磁盘缓存，保证每次都真正发出请求
+            mock.patch.object(app, "_leg_disk_cache_get", return_value=None),
+            mock.patch.object(app, "_leg_disk_cache_put"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        app._driving_leg_cached.cache_clear()
+        self.addCleanup(app._driving_leg_cached.cache_clear)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _assert_attempts(self, status: int):
+        _StatusHandler.status = status
+        with self.assertRaises(RuntimeError):
+            app._driving_leg_cached(118.1, 32.1, 118.2, 32.2)
+        self.assertEqual(_StatusHandler.hits, app.API_RETRY_COUNT)
+
+    def test_rate_limited_leg_is_requested_api_retry_count_times(self):
+        self._assert_attempts(429)
+
+    def test_server_error_leg_is_requested_api_retry_count_times(self):
+        self._assert_attempts(500)
+
+
+if __name__ == "__main__":
+    unittest.main()
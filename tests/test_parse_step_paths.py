@@ -0,0 +1,60 @@
+# tests/test_parse_step_paths.py
+"""
+路线点解析测试：快速路径与逐点解析结果一致，且多线程并发解析不改动全局警告过滤器
+"""
+
+import os
+import sys
+import threading
+import unittest
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+class ParseStepPathsTest(unittest.TestCase):
+
+    def test_well_formed_paths(self):
+        steps = [{"path": "118.1,32.1;118.2,32.2"}, {"path": ""}, {"path": "118.3,32.3"}]
+        poly = app._parse_step_paths(steps)
+        np.testing.assert_array_equal(poly, [[118.1, 32.1], [118.2, 32.2], [118.3, 32.3]])
+
+    def test_malformed_points_are_skipped(self):
+        poly = app._parse_step_paths([{"path": "118.1,32.1;bad,32.2;118.3;118.4,32, 4;118.5,32.5"}])
+        np.testing.assert_array_equal(poly, [[118.1, 32.1], [118.5, 32.5]])
+
+    def test_empty_steps(self):
+        self.assertEqual(app._parse_step_paths([]).shape, (0, 2))
+        self.assertEqual(app._parse_step_paths(None).shape, (0, 2))
+
+    def test_concurrent_parsing_leaves_warning_filters_unchanged(self):
+        filters_before = list(warnings.filters)
+        steps_list = [
+            [{"path": ";".join(f"{118 + i * 1e-4:.6f},{32 + i * 1e-4:.6f}" for i in range(200))}],
+            [{"path": "118.1,32.1;bad,32.2;118.3,32.3"}],
+        ]
+        errors = []
+
+        def worker():
+            try:
+                for k in range(500):
+                    app._parse_step_paths(steps_list[k % 2])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(warnings.filters, filters_before)
+
+
+if __name__ == "__main__":
+    unittest.main()